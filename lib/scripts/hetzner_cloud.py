@@ -7,172 +7,437 @@ Used by HetznerService and HetznerSnapshotService for server control and snapsho
 import sys
 import json
 import time
-from datetime import datetime
-from hcloud import Client
+import random
+import asyncio
+import functools
+import dataclasses
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Optional
+import requests
+from requests.adapters import HTTPAdapter
+from hcloud import APIException, Client
+from hcloud.actions.domain import Action, ActionFailedException, ActionTimeoutException
 from hcloud.images.domain import Image
 from hcloud.servers.domain import Server
 
-def json_response(success, data=None, error=None):
+try:
+    import orjson
+except ImportError:  # Optional: falls back to the (slower) stdlib json module
+    orjson = None
+
+# Image statuses (hcloud has constants for server statuses, but not for images)
+IMAGE_STATUS_CREATING = "creating"
+IMAGE_STATUS_AVAILABLE = "available"
+
+# Snapshot polling backoff: decorrelated jitter starting at 1s, capped at 30s
+SNAPSHOT_POLL_BASE = 1.0
+SNAPSHOT_POLL_CAP = 30.0
+
+# Action polling backoff: 1s -> 2s -> 4s -> ... capped at 10s, for up to 5 minutes
+ACTION_POLL_BASE = 1.0
+ACTION_POLL_CAP = 10.0
+ACTION_TIMEOUT = 300
+
+# List requests: page size (the API maximum) and how many pages to fetch at once
+LIST_PAGE_SIZE = 50
+LIST_PAGE_WORKERS = 4
+
+# API error codes (or HTTP statuses, for non-JSON error bodies) meaning Hetzner is temporarily unavailable
+UNAVAILABLE_ERROR_CODES = {'rate_limit_exceeded', 'maintenance', 'unavailable', 'timeout', 429, 502, 503, 504}
+
+# Serve mode: worker threads for concurrently running commands
+SERVE_WORKERS = 32
+
+# Responses kept for polling callers: (operation, api_token, *args) -> (fetched_at, data)
+_response_cache = {}
+
+@dataclasses.dataclass
+class SnapshotInfo:
+    """Snapshot entry returned by list_snapshots (slotted: no per-instance __dict__)"""
+    __slots__ = (
+        'snapshot_id', 'description', 'status', 'created', 'disk_size', 'image_size', 'created_from_id'
+    )
+    snapshot_id: int
+    description: Optional[str]
+    status: str
+    created: Optional[datetime]
+    disk_size: Optional[float]
+    image_size: Optional[float]
+    created_from_id: Optional[int]
+
+@functools.lru_cache(maxsize=4)
+def _get_client(api_token):
+    """Return a shared client per token so its HTTP session (and TLS connection) is reused"""
+    client = Client(token=api_token)
+
+    # Keep a pooled connection per serve worker (urllib3 defaults to 10 and discards the rest)
+    session = _client_session(client)
+    if session is not None:
+        session.mount('https://', HTTPAdapter(pool_maxsize=SERVE_WORKERS))
+    return client
+
+def _client_session(client):
+    """Return the requests.Session behind an hcloud Client (its attribute moved in hcloud 2.x)"""
+    base = getattr(client, '_client', client)
+    return getattr(base, '_session', None) or getattr(client, '_requests_session', None)
+
+def exponential_backoff_function(*, base, multiplier, cap, jitter=False):
+    """Return a truncated exponential backoff function (mirrors hcloud's signature)"""
+    def func(retries):
+        interval = base * multiplier ** retries
+        if jitter:
+            # Spread delays by +/-20% so parallel pollers don't wake in lockstep
+            interval *= random.uniform(0.8, 1.2)
+        return min(cap, interval)
+
+    return func
+
+def decorrelated_jitter_backoff_function(*, base, cap):
+    """Return a no-argument backoff function with decorrelated jitter (each delay random in [base, 3x previous])"""
+    previous = base
+
+    def func():
+        nonlocal previous
+        previous = min(cap, random.uniform(base, previous * 3))
+        return previous
+
+    return func
+
+def _get_all_pages(list_function, **filters):
+    """Fetch every page of a list call, requesting pages 2..N concurrently once page 1 gives the count"""
+    results, meta = list_function(page=1, per_page=LIST_PAGE_SIZE, **filters)
+    results = list(results)
+    results.extend(_get_remaining_pages(list_function, _last_page(meta), **filters))
+    return results
+
+def _last_page(meta):
+    """Number of pages reported by a list response (1 if it isn't paginated)"""
+    return meta.pagination.last_page if meta and meta.pagination and meta.pagination.last_page else 1
+
+def _get_remaining_pages(list_function, last_page, **filters):
+    """Fetch pages 2..last_page of a list call concurrently"""
+    results = []
+    if last_page > 1:
+        def fetch_page(page):
+            return list_function(page=page, per_page=LIST_PAGE_SIZE, **filters)[0]
+
+        with ThreadPoolExecutor(max_workers=min(LIST_PAGE_WORKERS, last_page - 1)) as executor:
+            for page_results in executor.map(fetch_page, range(2, last_page + 1)):
+                results.extend(page_results)
+
+    return results
+
+def _cache_lookup(key, ttl_ms):
+    """Return cached data for key, marked as served from cache, if younger than ttl_ms"""
+    entry = _response_cache.get(key)
+    if ttl_ms and entry and (time.time() - entry[0]) * 1000 < ttl_ms:
+        return dict(entry[1], served_from_cache=True)
+    return None
+
+def _cache_fallback(key):
+    """Return the last cached data for key, marked stale, regardless of age (None if never cached)"""
+    entry = _response_cache.get(key)
+    if not entry:
+        return None
+    fetched_at, data = entry
+    return dict(data, served_from_cache=True, stale=True, cache_age_seconds=int(time.time() - fetched_at))
+
+def _cache_store(key, data):
+    """Cache data for key, stamped after the API call returned"""
+    _response_cache[key] = (time.time(), data)
+
+def _cache_update_status(api_token, server_id, status):
+    """Overwrite only the status of a cached server entry after a successful power action"""
+    cache_key = ('status', api_token, server_id)
+    entry = _response_cache.get(cache_key)
+    if entry:
+        _cache_store(cache_key, dict(entry[1], status=status))
+
+def _is_unavailable_error(error):
+    """Whether an error means the API is rate limiting or unreachable, rather than rejecting the request"""
+    if isinstance(error, APIException):
+        return error.code in UNAVAILABLE_ERROR_CODES
+    return isinstance(error, (requests.exceptions.ConnectionError, requests.exceptions.Timeout))
+
+def wait_for_action(action, timeout=ACTION_TIMEOUT):
+    """Wait for an action to finish, polling the actions endpoint with backoff"""
+    backoff = exponential_backoff_function(
+        base=ACTION_POLL_BASE, multiplier=2, cap=ACTION_POLL_CAP, jitter=True
+    )
+    deadline = time.time() + timeout
+    attempt = 0
+
+    while action.status == Action.STATUS_RUNNING:
+        remaining = deadline - time.time()
+        if remaining <= 0:
+            raise ActionTimeoutException(action)
+        time.sleep(min(backoff(attempt), remaining))
+        action.reload()
+        attempt += 1
+
+    if action.status == Action.STATUS_ERROR:
+        raise ActionFailedException(action)
+
+def _json_default(obj):
+    """Serialize values the stdlib json module can't (orjson handles these natively)"""
+    if isinstance(obj, datetime):
+        return obj.isoformat()
+    if dataclasses.is_dataclass(obj):
+        return dataclasses.asdict(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+def dumps(obj, pretty=True):
+    """Serialize obj to a JSON string, using orjson when available"""
+    if orjson:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2 if pretty else 0).decode()
+    return json.dumps(obj, indent=2 if pretty else None, default=_json_default)
+
+def json_response(success, data=None, error=None, pretty=True):
     """Return standardized JSON response"""
+    return dumps(build_response(success, data, error), pretty)
+
+def build_response(success, data=None, error=None):
+    """Build the standardized response dict (serialized by json_response)"""
     response = {
         'success': success,
-        'timestamp': datetime.now().isoformat()
+        # Kept as a datetime so orjson formats it natively
+        'timestamp': datetime.now(timezone.utc)
     }
     if data:
         response['data'] = data
     if error:
         response['error'] = error
-    return json.dumps(response, indent=2)
+    return response
 
 def start_server(api_token, server_id):
     """Power on a server"""
     try:
-        client = Client(token=api_token)
+        client = _get_client(api_token)
         server = client.servers.get_by_id(server_id)
 
         if not server:
-            return json_response(False, error=f"Server {server_id} not found")
+            return build_response(False, error=f"Server {server_id} not found")
 
         if server.status == Server.STATUS_RUNNING:
-            return json_response(True, data={
+            return build_response(True, data={
                 'server_id': server.id,
                 'name': server.name,
                 'status': 'running',
                 'message': 'Server is already running'
             })
 
-        action = server.power_on()
-        action.wait_until_finished(max_retries=60)  # Wait up to 5 minutes
-
-        server = client.servers.get_by_id(server_id)  # Refresh
+        # A successful power_on action means the server is running, no refresh needed
+        wait_for_action(server.power_on())
+        _cache_update_status(api_token, server_id, Server.STATUS_RUNNING)
 
-        return json_response(True, data={
+        return build_response(True, data={
             'server_id': server.id,
             'name': server.name,
-            'status': server.status,
+            'status': Server.STATUS_RUNNING,
             'public_ipv4': server.public_net.ipv4.ip if server.public_net.ipv4 else None,
             'message': 'Server started successfully'
         })
     except Exception as e:
-        return json_response(False, error=str(e))
+        return build_response(False, error=str(e))
 
 def stop_server(api_token, server_id):
     """Gracefully shutdown a server"""
     try:
-        client = Client(token=api_token)
+        client = _get_client(api_token)
         server = client.servers.get_by_id(server_id)
 
         if not server:
-            return json_response(False, error=f"Server {server_id} not found")
+            return build_response(False, error=f"Server {server_id} not found")
 
         if server.status == Server.STATUS_OFF:
-            return json_response(True, data={
+            return build_response(True, data={
                 'server_id': server.id,
                 'name': server.name,
                 'status': 'off',
                 'message': 'Server is already stopped'
             })
 
-        action = server.shutdown()
-        action.wait_until_finished(max_retries=60)
-
-        server = client.servers.get_by_id(server_id)
+        wait_for_action(server.shutdown())
+        _cache_update_status(api_token, server_id, Server.STATUS_OFF)
 
-        return json_response(True, data={
+        return build_response(True, data={
             'server_id': server.id,
             'name': server.name,
-            'status': server.status,
+            'status': Server.STATUS_OFF,
             'message': 'Server stopped successfully'
         })
     except Exception as e:
-        return json_response(False, error=str(e))
+        return build_response(False, error=str(e))
 
 def reboot_server(api_token, server_id):
     """Reboot a server"""
     try:
-        client = Client(token=api_token)
+        client = _get_client(api_token)
         server = client.servers.get_by_id(server_id)
 
         if not server:
-            return json_response(False, error=f"Server {server_id} not found")
+            return build_response(False, error=f"Server {server_id} not found")
 
-        action = server.reboot()
-        action.wait_until_finished(max_retries=60)
+        wait_for_action(server.reboot())
+        _cache_update_status(api_token, server_id, Server.STATUS_RUNNING)
 
-        return json_response(True, data={
+        return build_response(True, data={
             'server_id': server.id,
             'name': server.name,
             'status': 'rebooting',
             'message': 'Server rebooted successfully'
         })
     except Exception as e:
-        return json_response(False, error=str(e))
+        return build_response(False, error=str(e))
+
+def _server_status_data(server):
+    """Build the status payload for a server"""
+    return {
+        'server_id': server.id,
+        'name': server.name,
+        'status': server.status,
+        'server_type': server.server_type.name,
+        'datacenter': server.datacenter.name if server.datacenter else None,
+        'location': server.datacenter.location.name if server.datacenter else None,
+        'public_ipv4': server.public_net.ipv4.ip if server.public_net.ipv4 else None,
+        'public_ipv6': server.public_net.ipv6.ip if server.public_net.ipv6 else None,
+        'created': server.created,
+        'backup_window': server.backup_window,
+        'locked': server.locked
+    }
 
-def get_server_status(api_token, server_id):
-    """Get current server status and details"""
+def get_server_status(api_token, server_id, ttl_ms=0):
+    """Get current server status and details (optionally cached for ttl_ms)"""
     try:
-        client = Client(token=api_token)
+        cache_key = ('status', api_token, server_id)
+        cached = _cache_lookup(cache_key, ttl_ms)
+        if cached:
+            return build_response(True, data=cached)
+
+        client = _get_client(api_token)
         server = client.servers.get_by_id(server_id)
 
         if not server:
-            return json_response(False, error=f"Server {server_id} not found")
+            return build_response(False, error=f"Server {server_id} not found")
 
-        return json_response(True, data={
-            'server_id': server.id,
-            'name': server.name,
-            'status': server.status,
-            'server_type': server.server_type.name,
-            'datacenter': server.datacenter.name if server.datacenter else None,
-            'location': server.datacenter.location.name if server.datacenter else None,
-            'public_ipv4': server.public_net.ipv4.ip if server.public_net.ipv4 else None,
-            'public_ipv6': server.public_net.ipv6.ip if server.public_net.ipv6 else None,
-            'created': server.created.isoformat() if server.created else None,
-            'backup_window': server.backup_window,
-            'locked': server.locked
+        data = _server_status_data(server)
+        _cache_store(cache_key, data)
+
+        return build_response(True, data=data)
+    except Exception as e:
+        return build_response(False, error=str(e))
+
+def _get_server_or_none(client, server_id):
+    """Fetch one server, returning None if it doesn't exist"""
+    try:
+        return client.servers.get_by_id(server_id)
+    except APIException as e:
+        if e.code == 'not_found':
+            return None
+        raise
+
+def get_server_status_batch(api_token, server_ids):
+    """Get status and details for many servers, from the server list or per-server GETs"""
+    try:
+        server_ids = list(dict.fromkeys(server_ids))
+        if not server_ids:
+            return build_response(True, data={'servers': [], 'count': 0, 'missing': []})
+
+        client = _get_client(api_token)
+        wanted = set(server_ids)
+
+        # Page 1 of the server list also tells us how many pages the project has
+        first_page, meta = client.servers.get_list(page=1, per_page=LIST_PAGE_SIZE)
+        found = {server.id: server for server in first_page if server.id in wanted}
+        remaining = [server_id for server_id in server_ids if server_id not in found]
+        pages_left = _last_page(meta) - 1
+
+        if remaining and len(remaining) <= pages_left:
+            # Fewer servers left than pages: one GET per server (concurrently) is cheaper
+            with ThreadPoolExecutor(max_workers=min(LIST_PAGE_WORKERS, len(remaining))) as executor:
+                others = executor.map(functools.partial(_get_server_or_none, client), remaining)
+                found.update((server.id, server) for server in others if server)
+        elif remaining:
+            # One list request per 50 servers (pages fetched concurrently) instead of one GET per server
+            for server in _get_remaining_pages(client.servers.get_list, pages_left + 1):
+                if server.id in wanted:
+                    found[server.id] = server
+
+        servers = []
+        for server_id in server_ids:
+            if server_id in found:
+                data = _server_status_data(found[server_id])
+                _cache_store(('status', api_token, server_id), data)
+                servers.append(data)
+
+        return build_response(True, data={
+            'servers': servers,
+            'count': len(servers),
+            'missing': [server_id for server_id in server_ids if server_id not in found]
         })
     except Exception as e:
-        return json_response(False, error=str(e))
+        return build_response(False, error=str(e))
 
 def check_snapshot_in_progress(api_token, server_id):
     """Check if server has a snapshot currently being created"""
     try:
-        client = Client(token=api_token)
-
-        # Get all snapshots (images of type snapshot)
-        images = client.images.get_all(type="snapshot")
-
-        # Filter for this server's snapshots that are in 'creating' status
-        for img in images:
-            # Check if snapshot is for this server (by created_from metadata)
-            if img.created_from and img.created_from.id == server_id:
-                if img.status == "creating":
-                    return {
-                        'in_progress': True,
-                        'snapshot_id': img.id,
-                        'description': img.description,
-                        'status': img.status
-                    }
-
-        return {'in_progress': False}
+        client = _get_client(api_token)
+
+        # Only ask the API for snapshots still being created, newest first, instead of
+        # paging through every snapshot in the project. The query is built here because
+        # hcloud's images.get_list sends per_page as the status filter.
+        response = client.request(
+            method="GET",
+            url="/images",
+            params={
+                "type": "snapshot",
+                "status": IMAGE_STATUS_CREATING,
+                "sort": "created:desc",
+                "per_page": LIST_PAGE_SIZE
+            }
+        )
+
+        # First snapshot for this server (by created_from metadata) still in 'creating' status
+        img = next(
+            (img for img in response.get('images', [])
+             if (img.get('created_from') or {}).get('id') == server_id
+             and img.get('status') == IMAGE_STATUS_CREATING),
+            None
+        )
+
+        if img is None:
+            return {'in_progress': False}
+
+        return {
+            'in_progress': True,
+            'snapshot_id': img['id'],
+            'description': img.get('description'),
+            'status': img['status']
+        }
     except Exception as e:
         # If check fails, allow creation attempt to proceed
         return {'in_progress': False, 'error': str(e)}
 
-def create_snapshot(api_token, server_id, description):
+async def create_snapshot_async(api_token, server_id, description):
     """Create a snapshot (image) of a server"""
     try:
-        client = Client(token=api_token)
-        server = client.servers.get_by_id(server_id)
+        client = _get_client(api_token)
+        loop = asyncio.get_running_loop()
 
-        if not server:
-            return json_response(False, error=f"Server {server_id} not found")
+        # Fetch the server and check for an in-progress snapshot concurrently,
+        # the two lookups are independent round-trips
+        server, check_result = await asyncio.gather(
+            loop.run_in_executor(None, client.servers.get_by_id, server_id),
+            loop.run_in_executor(None, check_snapshot_in_progress, api_token, server_id)
+        )
 
-        # Check if a snapshot is already being created for this server
-        check_result = check_snapshot_in_progress(api_token, server_id)
+        if not server:
+            return build_response(False, error=f"Server {server_id} not found")
 
         if check_result['in_progress']:
             # Return success with the existing snapshot ID to wait for it
-            return json_response(True, data={
+            return build_response(True, data={
                 'snapshot_id': check_result['snapshot_id'],
                 'description': check_result['description'],
                 'status': check_result['status'],
@@ -181,15 +446,19 @@ def create_snapshot(api_token, server_id, description):
             })
 
         # No snapshot in progress, create a new one
-        response = server.create_image(description=description, type="snapshot")
+        response = server.create_image(
+            description=description,
+            type="snapshot",
+            labels={'server_id': str(server_id)}
+        )
         image = response.image
         action = response.action
 
-        return json_response(True, data={
+        return build_response(True, data={
             'snapshot_id': image.id,
             'description': image.description,
             'status': image.status,
-            'created': image.created.isoformat() if image.created else None,
+            'created': image.created,
             'disk_size': image.disk_size,
             'image_size': image.image_size,
             'action_id': action.id,
@@ -197,120 +466,265 @@ def create_snapshot(api_token, server_id, description):
             'message': 'Snapshot creation initiated'
         })
     except Exception as e:
-        return json_response(False, error=str(e))
+        return build_response(False, error=str(e))
+
+def create_snapshot(api_token, server_id, description):
+    """Create a snapshot (image) of a server"""
+    return asyncio.run(create_snapshot_async(api_token, server_id, description))
 
 def wait_for_snapshot(api_token, snapshot_id, timeout=900):
     """Wait for snapshot to complete (max timeout in seconds)"""
     try:
-        client = Client(token=api_token)
+        client = _get_client(api_token)
+        # Parallel waiters (batch snapshot jobs) drift apart instead of polling in lockstep
+        backoff = decorrelated_jitter_backoff_function(base=SNAPSHOT_POLL_BASE, cap=SNAPSHOT_POLL_CAP)
         start_time = time.time()
 
         while (time.time() - start_time) < timeout:
             image = client.images.get_by_id(snapshot_id)
 
             if not image:
-                return json_response(False, error=f"Snapshot {snapshot_id} not found")
+                return build_response(False, error=f"Snapshot {snapshot_id} not found")
 
-            if image.status == "available":
-                return json_response(True, data={
+            status = image.status
+            if status == IMAGE_STATUS_AVAILABLE:
+                return build_response(True, data={
                     'snapshot_id': image.id,
                     'description': image.description,
-                    'status': 'available',
+                    'status': IMAGE_STATUS_AVAILABLE,
                     'disk_size': image.disk_size,
                     'image_size': image.image_size,
                     'duration_seconds': int(time.time() - start_time),
                     'message': 'Snapshot completed successfully'
                 })
-            elif image.status == "creating":
-                time.sleep(10)  # Check every 10 seconds
+            elif status == IMAGE_STATUS_CREATING:
+                # Back off between polls, but never sleep past the deadline
+                remaining = timeout - (time.time() - start_time)
+                time.sleep(max(0, min(backoff(), remaining)))
             else:
-                return json_response(False, error=f"Unexpected snapshot status: {image.status}")
+                return build_response(False, error=f"Unexpected snapshot status: {status}")
 
-        return json_response(False, error=f"Snapshot creation timed out after {timeout} seconds")
+        return build_response(False, error=f"Snapshot creation timed out after {timeout} seconds")
     except Exception as e:
-        return json_response(False, error=str(e))
-
-def list_snapshots(api_token, server_name=None, server_id=None):
-    """List all snapshots, optionally filtered by server name or ID"""
+        return build_response(False, error=str(e))
+
+def _filter_snapshots(images, server_name=None, server_id=None):
+    """Build snapshot info for images and pick the best filter; returns (snapshots, filter_used)"""
+    # Build each snapshot's info once; the filters below only select from this list
+    all_snapshots_for_project = [
+        SnapshotInfo(
+            snapshot_id=img.id,
+            description=img.description,
+            status=img.status,
+            created=img.created,
+            disk_size=img.disk_size,
+            image_size=img.image_size,
+            created_from_id=img.created_from.id if img.created_from else None
+        )
+        for img in images
+    ]
+
+    # Fallback: Show all project snapshots (better than showing none)
+    # This helps with old snapshots that don't have proper naming
+    snapshots = all_snapshots_for_project
+    filter_used = 'all_project'
+
+    # Best: Match by created_from server ID (most reliable)
+    if server_id:
+        target_id = int(server_id)
+        snapshots_for_server = [
+            snap for snap in all_snapshots_for_project if snap.created_from_id == target_id
+        ]
+        if snapshots_for_server:
+            snapshots, filter_used = snapshots_for_server, 'server_id'
+
+    # Good: Match by description prefix (for new snapshots with hostname),
+    # only tried when the server ID match found nothing
+    if server_name and filter_used == 'all_project':
+        prefix = f"{server_name}-"
+        snapshots_with_prefix = [
+            snap for snap in all_snapshots_for_project
+            if snap.description and snap.description.startswith(prefix)
+        ]
+        if snapshots_with_prefix:
+            snapshots, filter_used = snapshots_with_prefix, 'hostname_prefix'
+
+    return snapshots, filter_used
+
+def list_snapshots(api_token, server_name=None, server_id=None, ttl_ms=0):
+    """List all snapshots, optionally filtered by server name or ID (optionally cached for ttl_ms)"""
     try:
-        client = Client(token=api_token)
+        cache_key = ('list_snapshots', api_token, server_name, server_id)
+        cached = _cache_lookup(cache_key, ttl_ms)
+        if cached:
+            return build_response(True, data=cached)
+
+        client = _get_client(api_token)
 
         # Get all images of type snapshot
-        images = client.images.get_all(type="snapshot")
-
-        snapshots = []
-        snapshots_with_prefix = []
-        snapshots_for_server = []
-        all_snapshots_for_project = []
-
-        for img in images:
-            # Build snapshot info
-            snapshot_info = {
-                'snapshot_id': img.id,
-                'description': img.description,
-                'status': img.status,
-                'created': img.created.isoformat() if img.created else None,
-                'disk_size': img.disk_size,
-                'image_size': img.image_size,
-                'created_from_id': img.created_from.id if img.created_from else None
-            }
+        try:
+            images = _get_all_pages(client.images.get_list, type=["snapshot"])
+        except Exception as e:
+            # Serve the last good list while Hetzner is rate limiting or down
+            stale = _cache_fallback(cache_key) if _is_unavailable_error(e) else None
+            if stale is None:
+                raise
+            return build_response(True, data=stale)
+
+        snapshots, filter_used = _filter_snapshots(images, server_name, server_id)
+
+        data = {
+            'snapshots': snapshots,
+            'count': len(snapshots),
+            'filter_used': filter_used
+        }
+        _cache_store(cache_key, data)
 
-            all_snapshots_for_project.append(snapshot_info)
+        return build_response(True, data=data)
+    except Exception as e:
+        return build_response(False, error=str(e))
 
-            # If filtering requested, try multiple matching strategies
-            if server_name or server_id:
-                # Strategy 1: Match by created_from server ID (most reliable)
-                if server_id and img.created_from and img.created_from.id == int(server_id):
-                    snapshots_for_server.append(snapshot_info)
+def stream_snapshots(api_token, server_name=None, server_id=None, out=None):
+    """Write snapshots as newline-delimited JSON (one per line), then a summary response line"""
+    out = out or sys.stdout
+    try:
+        client = _get_client(api_token)
+        images = _get_all_pages(client.images.get_list, type=["snapshot"])
+        snapshots, filter_used = _filter_snapshots(images, server_name, server_id)
 
-                # Strategy 2: Match by description prefix (for new snapshots with hostname)
-                if server_name and img.description.startswith(f"{server_name}-"):
-                    snapshots_with_prefix.append(snapshot_info)
-            else:
-                # No filter - include all
-                snapshots.append(snapshot_info)
-
-        # Prioritize filtering strategies
-        if server_id and snapshots_for_server:
-            # Best: Found snapshots for this specific server by ID
-            snapshots = snapshots_for_server
-        elif server_name and snapshots_with_prefix:
-            # Good: Found snapshots with hostname prefix
-            snapshots = snapshots_with_prefix
-        elif server_name or server_id:
-            # Fallback: Show all project snapshots (better than showing none)
-            # This helps with old snapshots that don't have proper naming
-            snapshots = all_snapshots_for_project
-        # else: already set to all_snapshots_for_project if no filter
-
-        return json_response(True, data={
-            'snapshots': snapshots,
+        for snap in snapshots:
+            out.write(dumps(snap, pretty=False) + "\n")
+
+        summary = build_response(True, data={
             'count': len(snapshots),
-            'filter_used': 'server_id' if (server_id and snapshots_for_server) else 'hostname_prefix' if (server_name and snapshots_with_prefix) else 'all_project'
+            'filter_used': filter_used
         })
     except Exception as e:
-        return json_response(False, error=str(e))
+        summary = build_response(False, error=str(e))
+
+    out.write(dumps(summary, pretty=False) + "\n")
 
 def delete_snapshot(api_token, snapshot_id):
     """Delete a snapshot"""
     try:
-        client = Client(token=api_token)
+        client = _get_client(api_token)
         image = client.images.get_by_id(snapshot_id)
 
         if not image:
-            return json_response(False, error=f"Snapshot {snapshot_id} not found")
+            return build_response(False, error=f"Snapshot {snapshot_id} not found")
 
         image.delete()
 
-        return json_response(True, data={
+        return build_response(True, data={
             'snapshot_id': snapshot_id,
             'message': 'Snapshot deleted successfully'
         })
     except Exception as e:
-        return json_response(False, error=str(e))
+        return build_response(False, error=str(e))
+
+# Commands accepted by serve mode: name -> handler(api_token, request)
+SERVE_COMMANDS = {
+    'start': lambda api_token, req: start_server(api_token, int(req['server_id'])),
+    'stop': lambda api_token, req: stop_server(api_token, int(req['server_id'])),
+    'reboot': lambda api_token, req: reboot_server(api_token, int(req['server_id'])),
+    'status': lambda api_token, req: get_server_status(
+        api_token, int(req['server_id']), ttl_ms=int(req.get('ttl_ms', 0))
+    ),
+    'status_batch': lambda api_token, req: get_server_status_batch(
+        api_token, [int(server_id) for server_id in req['server_ids']]
+    ),
+    'create_snapshot': lambda api_token, req: create_snapshot(
+        api_token, int(req['server_id']), req['description']
+    ),
+    'wait_snapshot': lambda api_token, req: wait_for_snapshot(
+        api_token, int(req['snapshot_id']), int(req.get('timeout', 900))
+    ),
+    'list_snapshots': lambda api_token, req: list_snapshots(
+        api_token, req.get('server_name'), req.get('server_id'), ttl_ms=int(req.get('ttl_ms', 0))
+    ),
+    'delete_snapshot': lambda api_token, req: delete_snapshot(api_token, int(req['snapshot_id'])),
+}
+
+def _serve_one(api_token, line):
+    """Run one serve-mode request line and return its reply"""
+    request_id = None
+    try:
+        request = json.loads(line)
+        request_id = request.get('id')
+        handler = SERVE_COMMANDS.get(request.get('cmd'))
+        if handler:
+            result = handler(api_token, request)
+        else:
+            result = build_response(False, error=f"Unknown command: {request.get('cmd')}")
+    except (ValueError, KeyError, TypeError, AttributeError) as e:
+        result = build_response(False, error=f"Invalid request: {e}")
+
+    result['id'] = request_id
+    return result
+
+async def serve(api_token, max_workers=SERVE_WORKERS):
+    """
+    Long-lived worker: read one JSON command per stdin line, e.g.
+    {"id": 1, "cmd": "status", "server_id": 42}, and write one JSON reply per line.
+    Each command is dispatched as its own task as soon as its line is read, and its reply
+    is written when it finishes, so a slow command (e.g. wait_snapshot) never holds up
+    the ones behind it. Replies may therefore arrive out of order; match them by id.
+    """
+    loop = asyncio.get_running_loop()
+    write_lock = asyncio.Lock()
+    pending = set()
+    # Own pool for commands; the default executor keeps serving the blocking stdin reader
+    executor = ThreadPoolExecutor(max_workers=max_workers)
+
+    async def handle(line):
+        reply = await loop.run_in_executor(executor, _serve_one, api_token, line)
+        async with write_lock:
+            sys.stdout.write(dumps(reply, pretty=False) + "\n")
+            sys.stdout.flush()
+
+    while True:
+        line = await loop.run_in_executor(None, sys.stdin.readline)
+        if not line:
+            break  # EOF
+        if line.strip():
+            task = asyncio.ensure_future(handle(line))
+            pending.add(task)
+            task.add_done_callback(pending.discard)
+
+    if pending:
+        await asyncio.gather(*pending)
+    executor.shutdown()
+
+def _pop_option(args, name):
+    """Remove a --name=value option from args and return its value (None if absent)"""
+    prefix = f"--{name}="
+    for i, arg in enumerate(args):
+        if arg.startswith(prefix):
+            del args[i]
+            return arg[len(prefix):]
+    return None
+
+def _pop_flag(args, name):
+    """Remove a --name flag from args and return whether it was present"""
+    flag = f"--{name}"
+    if flag in args:
+        args.remove(flag)
+        return True
+    return False
 
 def main():
     """Main entry point for command-line usage"""
+    # Optional response cache TTL, e.g. --ttl-ms=5000. The cache lives in this process, so a
+    # one-shot CLI call never hits it; polling callers get caching from serve mode, by
+    # passing "ttl_ms" with each status/list_snapshots command.
+    try:
+        ttl_ms = int(_pop_option(sys.argv, 'ttl-ms') or 0)
+    except ValueError:
+        print(json_response(False, error="Invalid --ttl-ms value (expected an integer number of milliseconds)"))
+        sys.exit(1)
+    # Emit list output as newline-delimited JSON instead of one document
+    stream = _pop_flag(sys.argv, 'stream')
+
     if len(sys.argv) < 3:
         print(json_response(False, error="Usage: hetzner_cloud.py <command> <api_token> [args...]"))
         sys.exit(1)
@@ -318,52 +732,66 @@ def main():
     command = sys.argv[1]
     api_token = sys.argv[2]
 
-    if command == "start":
+    if command == "serve":
+        asyncio.run(serve(api_token))
+
+    elif command == "start":
         if len(sys.argv) < 4:
             print(json_response(False, error="Usage: hetzner_cloud.py start <api_token> <server_id>"))
             sys.exit(1)
-        print(start_server(api_token, int(sys.argv[3])))
+        print(dumps(start_server(api_token, int(sys.argv[3]))))
 
     elif command == "stop":
         if len(sys.argv) < 4:
             print(json_response(False, error="Usage: hetzner_cloud.py stop <api_token> <server_id>"))
             sys.exit(1)
-        print(stop_server(api_token, int(sys.argv[3])))
+        print(dumps(stop_server(api_token, int(sys.argv[3]))))
 
     elif command == "reboot":
         if len(sys.argv) < 4:
             print(json_response(False, error="Usage: hetzner_cloud.py reboot <api_token> <server_id>"))
             sys.exit(1)
-        print(reboot_server(api_token, int(sys.argv[3])))
+        print(dumps(reboot_server(api_token, int(sys.argv[3]))))
 
     elif command == "status":
         if len(sys.argv) < 4:
-            print(json_response(False, error="Usage: hetzner_cloud.py status <api_token> <server_id>"))
+            print(json_response(False, error="Usage: hetzner_cloud.py status <api_token> <server_id> [--ttl-ms=N (no effect on one-shot calls; cache via serve's ttl_ms)]"))
+            sys.exit(1)
+        print(dumps(get_server_status(api_token, int(sys.argv[3]), ttl_ms=ttl_ms)))
+
+    elif command == "status_batch":
+        if len(sys.argv) < 4:
+            print(json_response(False, error="Usage: hetzner_cloud.py status_batch <api_token> <server_id,server_id,...>"))
             sys.exit(1)
-        print(get_server_status(api_token, int(sys.argv[3])))
+        server_ids = [int(server_id) for server_id in sys.argv[3].split(',') if server_id]
+        print(dumps(get_server_status_batch(api_token, server_ids)))
 
     elif command == "create_snapshot":
         if len(sys.argv) < 5:
             print(json_response(False, error="Usage: hetzner_cloud.py create_snapshot <api_token> <server_id> <description>"))
             sys.exit(1)
-        print(create_snapshot(api_token, int(sys.argv[3]), sys.argv[4]))
+        print(dumps(create_snapshot(api_token, int(sys.argv[3]), sys.argv[4])))
 
     elif command == "wait_snapshot":
         if len(sys.argv) < 4:
             print(json_response(False, error="Usage: hetzner_cloud.py wait_snapshot <api_token> <snapshot_id> [timeout]"))
             sys.exit(1)
         timeout = int(sys.argv[4]) if len(sys.argv) > 4 else 900
-        print(wait_for_snapshot(api_token, int(sys.argv[3]), timeout))
+        print(dumps(wait_for_snapshot(api_token, int(sys.argv[3]), timeout)))
 
     elif command == "list_snapshots":
         server_name = sys.argv[3] if len(sys.argv) > 3 else None
-        print(list_snapshots(api_token, server_name))
+        server_id = sys.argv[4] if len(sys.argv) > 4 else None
+        if stream:
+            stream_snapshots(api_token, server_name, server_id)
+        else:
+            print(dumps(list_snapshots(api_token, server_name, server_id, ttl_ms=ttl_ms)))
 
     elif command == "delete_snapshot":
         if len(sys.argv) < 4:
             print(json_response(False, error="Usage: hetzner_cloud.py delete_snapshot <api_token> <snapshot_id>"))
             sys.exit(1)
-        print(delete_snapshot(api_token, int(sys.argv[3])))
+        print(dumps(delete_snapshot(api_token, int(sys.argv[3]))))
 
     else:
         print(json_response(False, error=f"Unknown command: {command}"))
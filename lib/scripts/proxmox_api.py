@@ -5,18 +5,64 @@ Used by ProxmoxService for VM/LXC control and snapshot management
 Supports both QEMU VMs and LXC containers
 """
 
+import os
 import sys
 import json
-import time
+import functools
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from proxmoxer import ProxmoxAPI
-import urllib3
+from enum import Enum
 
-# Disable SSL warnings if verify_ssl is False
-urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+try:
+    import orjson
+except ImportError:  # Optional: falls back to the (slower) stdlib json module
+    orjson = None
+
+# ProxmoxAPI instances per (host, username, token, verify_ssl), so calls in the same
+# process reuse one requests.Session and its keep-alive connections. pveproxy only
+# serves HTTP/1.1 over TLS on :8006 (no API UNIX socket), so keep-alive is what
+# amortizes the TLS handshake; the daemon command extends that to many requests.
+_PROXMOX_CACHE = {}
+
+# Indented output (--pretty CLI flag); compact single-line JSON otherwise
+PRETTY = False
+
+# Set once InsecureRequestWarning has been silenced for a verify_ssl=False connection
+_warnings_disabled = False
+
+# Connection pool sizing for concurrent calls (urllib3 defaults to 10 and discards the rest)
+POOL_CONNECTIONS = 32
+POOL_MAXSIZE = 64
+
+# HTTP timeouts in seconds: fail fast if pveproxy is unreachable, but allow slow API calls.
+# Each cap applies per attempt. Connect and read failures are not retried, so a dead or
+# hung pveproxy fails after one CONNECT_TIMEOUT or READ_TIMEOUT. Only 502/503/504 responses
+# are retried (up to 3 times, about 2s of backoff), so the absolute worst case is four
+# slow 5xx answers: 4 x (CONNECT_TIMEOUT + READ_TIMEOUT) plus backoff.
+CONNECT_TIMEOUT = float(os.environ.get('PROXMOX_CONNECT_TIMEOUT', 3.05))
+READ_TIMEOUT = float(os.environ.get('PROXMOX_READ_TIMEOUT', 30))
+
+# Concurrent status requests in get_vm_status_batch (kept below POOL_MAXSIZE)
+STATUS_BATCH_WORKERS = 16
+
+class VMType(str, Enum):
+    """Guest types under /nodes/{node}/"""
+    QEMU = 'qemu'
+    LXC = 'lxc'
+
+    def __str__(self):
+        # Format as the plain value on every Python version (3.12 changed mixin enum formatting)
+        return self.value
+
+# Snapshot list entries that aren't real snapshots ('current' is the live state)
+_SKIP_NAMES = frozenset({'current', None})
 
 def json_response(success, data=None, error=None, message=None):
     """Return standardized JSON response"""
+    return dumps(build_response(success, data, error, message))
+
+def build_response(success, data=None, error=None, message=None):
+    """Build the standardized response dict (serialized by json_response)"""
     response = {
         'success': success,
         'timestamp': datetime.now().isoformat()
@@ -27,220 +73,262 @@ def json_response(success, data=None, error=None, message=None):
         response['error'] = error
     if message:
         response['message'] = message
-    return json.dumps(response, indent=2)
+    return response
+
+def dumps(obj):
+    """Serialize obj to a JSON string, using orjson when available"""
+    if orjson:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2 if PRETTY else 0).decode()
+    if PRETTY:
+        return json.dumps(obj, indent=2)
+    return json.dumps(obj, separators=(',', ':'))
+
+@functools.lru_cache(maxsize=16)
+def _parse_token(token):
+    """Split 'name=value' into (token_name, token_value); a bare value uses the 'api' token name"""
+    if '=' in token:
+        parts = token.split('=')
+        return parts[0], parts[1]
+    return 'api', token
+
+@functools.lru_cache(maxsize=None)
+def _get_proxmox_class():
+    """Import proxmoxer (and requests) on first connect, so usage and argument errors stay cheap"""
+    from proxmoxer import ProxmoxAPI
+    return ProxmoxAPI
+
+def _disable_insecure_warnings():
+    """Silence urllib3's InsecureRequestWarning, once, for unverified connections"""
+    global _warnings_disabled
+    if not _warnings_disabled:
+        import urllib3
+        urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+        _warnings_disabled = True
 
 def connect_proxmox(api_url, username, token, verify_ssl=True):
-    """Establish connection to Proxmox API"""
+    """Establish connection to Proxmox API (reused for the lifetime of the process)"""
     # Since this script runs ON the Proxmox server itself via Salt minion,
     # always connect to localhost to avoid SSL certificate issues
     # This bypasses hostname verification problems with self-signed certificates
     host = 'localhost'
 
-    # Connect to Proxmox using token authentication
-    # Use 'https' backend with localhost
-    proxmox = ProxmoxAPI(
-        host,
-        user=username,
-        token_name=token.split('=')[0] if '=' in token else 'api',
-        token_value=token.split('=')[1] if '=' in token else token,
-        backend='https',
-        verify_ssl=verify_ssl
-    )
+    key = (host, username, token, verify_ssl)
+    proxmox = _PROXMOX_CACHE.get(key)
+    if proxmox is None:
+        from requests.adapters import HTTPAdapter
+        from urllib3.util.retry import Retry
+
+        if not verify_ssl:
+            _disable_insecure_warnings()
+
+        # Connect to Proxmox using token authentication
+        # Use 'https' backend with localhost
+        token_name, token_value = _parse_token(token)
+        proxmox = _get_proxmox_class()(
+            host,
+            user=username,
+            token_name=token_name,
+            token_value=token_value,
+            backend='https',
+            verify_ssl=verify_ssl,
+            timeout=(CONNECT_TIMEOUT, READ_TIMEOUT)
+        )
+        # Larger pool plus retries on transient gateway errors (idempotent requests only).
+        # Connect/read errors and timeouts are not retried (see CONNECT_TIMEOUT above), and
+        # an exhausted status retry returns the last response so proxmoxer reports its error.
+        retry = Retry(
+            total=3, connect=0, read=0, status=3,
+            backoff_factor=0.3, status_forcelist=[502, 503, 504], raise_on_status=False
+        )
+        adapter = HTTPAdapter(pool_connections=POOL_CONNECTIONS, pool_maxsize=POOL_MAXSIZE, max_retries=retry)
+        proxmox._store['session'].mount('https://', adapter)
+        _PROXMOX_CACHE[key] = proxmox
     return proxmox
 
+def parse_vm_type(value):
+    """Convert a vm_type string to VMType; raises ValueError('Invalid VM type: X') if unknown"""
+    try:
+        return VMType(value)
+    except ValueError:
+        raise ValueError(f"Invalid VM type: {value}") from None
+
+def _get_resource(proxmox, node, vmid, vm_type):
+    """Return the proxmoxer handle for /nodes/{node}/{qemu|lxc}/{vmid}"""
+    return _leaf_resource(proxmox, node, vmid, parse_vm_type(vm_type))
+
+# proxmoxer resources are immutable URL builders, so each leaf handle is built once.
+# The ProxmoxAPI instance is part of the key; it hashes by identity and lives for the process.
+@functools.lru_cache(maxsize=256)
+def _leaf_resource(proxmox, node, vmid, vm_type):
+    """Build the resource handle for a VMType"""
+    return getattr(proxmox.nodes(node), vm_type.value)(vmid)
+
 def get_vm_status(api_url, username, token, node, vmid, vm_type, verify_ssl=True):
     """Get VM or LXC container status"""
     try:
         proxmox = connect_proxmox(api_url, username, token, verify_ssl)
         if not proxmox:
-            return json_response(False, error="Failed to connect to Proxmox API")
+            return build_response(False, error="Failed to connect to Proxmox API")
 
-        if vm_type == 'qemu':
-            vm_info = proxmox.nodes(node).qemu(vmid).status.current.get()
-        elif vm_type == 'lxc':
-            vm_info = proxmox.nodes(node).lxc(vmid).status.current.get()
-        else:
-            return json_response(False, error=f"Invalid VM type: {vm_type}")
+        vm_info = _get_resource(proxmox, node, vmid, vm_type).status.current.get()
 
-        return json_response(True, data={
-            'vmid': vmid,
+        return build_response(True, data=vm_status_data(node, vmid, vm_type, vm_info))
+    except Exception as e:
+        return build_response(False, error=str(e))
+
+def vm_status_data(node, vmid, vm_type, vm_info):
+    """Shape a status/current result for output"""
+    return {
+        'vmid': vmid,
+        'node': node,
+        'type': vm_type,
+        'status': vm_info['status'],
+        'uptime': vm_info.get('uptime', 0),
+        'cpus': vm_info.get('cpus', 0),
+        'memory': vm_info.get('mem', 0),
+        'maxmem': vm_info.get('maxmem', 0),
+        'name': vm_info.get('name', f'{vm_type}-{vmid}')
+    }
+
+def get_vm_status_batch(api_url, username, token, node, vms, verify_ssl=True):
+    """Get status for many VMs/containers at once; vms is a list of {"vmid": N, "type": "qemu"|"lxc"}"""
+    try:
+        proxmox = connect_proxmox(api_url, username, token, verify_ssl)
+        if not proxmox:
+            return build_response(False, error="Failed to connect to Proxmox API")
+
+        def fetch(vm):
+            fields = vm if isinstance(vm, dict) else {}
+            try:
+                vmid, vm_type = int(vm['vmid']), vm['type']
+                vm_info = _get_resource(proxmox, node, vmid, vm_type).status.current.get()
+                return vm_status_data(node, vmid, vm_type, vm_info)
+            except KeyError as e:
+                return {'vmid': fields.get('vmid'), 'type': fields.get('type'), 'error': f"Missing field: {e}"}
+            except Exception as e:
+                return {'vmid': fields.get('vmid'), 'type': fields.get('type'), 'error': str(e)}
+
+        # Requests run concurrently over the shared session's connection pool
+        with ThreadPoolExecutor(max_workers=STATUS_BATCH_WORKERS) as executor:
+            results = list(executor.map(fetch, vms))
+
+        return build_response(True, data={
             'node': node,
-            'type': vm_type,
-            'status': vm_info['status'],
-            'uptime': vm_info.get('uptime', 0),
-            'cpus': vm_info.get('cpus', 0),
-            'memory': vm_info.get('mem', 0),
-            'maxmem': vm_info.get('maxmem', 0),
-            'name': vm_info.get('name', f'{vm_type}-{vmid}')
+            'vms': [r for r in results if 'error' not in r],
+            'errors': [r for r in results if 'error' in r],
+            'count': len(results)
         })
     except Exception as e:
-        return json_response(False, error=str(e))
+        return build_response(False, error=str(e))
 
 def start_vm(api_url, username, token, node, vmid, vm_type, verify_ssl=True):
     """Start VM or LXC container"""
     try:
         proxmox = connect_proxmox(api_url, username, token, verify_ssl)
         if not proxmox:
-            return json_response(False, error="Failed to connect to Proxmox API")
+            return build_response(False, error="Failed to connect to Proxmox API")
+
+        resource = _get_resource(proxmox, node, vmid, vm_type)
 
         # Check current status
-        if vm_type == 'qemu':
-            current = proxmox.nodes(node).qemu(vmid).status.current.get()
-            if current['status'] == 'running':
-                return json_response(True, data={'status': 'running'}, message=f'{vm_type.upper()} is already running')
-
-            # Start VM
-            proxmox.nodes(node).qemu(vmid).status.start.post()
-        elif vm_type == 'lxc':
-            current = proxmox.nodes(node).lxc(vmid).status.current.get()
-            if current['status'] == 'running':
-                return json_response(True, data={'status': 'running'}, message=f'{vm_type.upper()} is already running')
-
-            # Start container
-            proxmox.nodes(node).lxc(vmid).status.start.post()
-        else:
-            return json_response(False, error=f"Invalid VM type: {vm_type}")
+        current = resource.status.current.get()
+        if current['status'] == 'running':
+            return build_response(True, data={'status': 'running'}, message=f'{vm_type.upper()} is already running')
 
-        # Wait a bit and check status
-        time.sleep(2)
+        # Return the task UPID right away; callers can poll status if they need to
+        upid = resource.status.start.post()
 
-        if vm_type == 'qemu':
-            new_status = proxmox.nodes(node).qemu(vmid).status.current.get()
-        else:
-            new_status = proxmox.nodes(node).lxc(vmid).status.current.get()
-
-        return json_response(True, data={
+        return build_response(True, data={
             'vmid': vmid,
             'node': node,
             'type': vm_type,
-            'status': new_status['status']
+            'status': 'starting',
+            'upid': upid
         }, message=f'{vm_type.upper()} start initiated')
     except Exception as e:
-        return json_response(False, error=str(e))
+        return build_response(False, error=str(e))
 
 def stop_vm(api_url, username, token, node, vmid, vm_type, verify_ssl=True):
     """Force stop VM or LXC container"""
     try:
         proxmox = connect_proxmox(api_url, username, token, verify_ssl)
         if not proxmox:
-            return json_response(False, error="Failed to connect to Proxmox API")
+            return build_response(False, error="Failed to connect to Proxmox API")
 
-        # Check current status
-        if vm_type == 'qemu':
-            current = proxmox.nodes(node).qemu(vmid).status.current.get()
-            if current['status'] == 'stopped':
-                return json_response(True, data={'status': 'stopped'}, message=f'{vm_type.upper()} is already stopped')
-
-            # Force stop VM
-            proxmox.nodes(node).qemu(vmid).status.stop.post()
-        elif vm_type == 'lxc':
-            current = proxmox.nodes(node).lxc(vmid).status.current.get()
-            if current['status'] == 'stopped':
-                return json_response(True, data={'status': 'stopped'}, message=f'{vm_type.upper()} is already stopped')
-
-            # Force stop container
-            proxmox.nodes(node).lxc(vmid).status.stop.post()
-        else:
-            return json_response(False, error=f"Invalid VM type: {vm_type}")
+        resource = _get_resource(proxmox, node, vmid, vm_type)
 
-        # Wait a bit and check status
-        time.sleep(2)
+        # Check current status
+        current = resource.status.current.get()
+        if current['status'] == 'stopped':
+            return build_response(True, data={'status': 'stopped'}, message=f'{vm_type.upper()} is already stopped')
 
-        if vm_type == 'qemu':
-            new_status = proxmox.nodes(node).qemu(vmid).status.current.get()
-        else:
-            new_status = proxmox.nodes(node).lxc(vmid).status.current.get()
+        # Force stop; return the task UPID right away, callers can poll status if they need to
+        upid = resource.status.stop.post()
 
-        return json_response(True, data={
+        return build_response(True, data={
             'vmid': vmid,
             'node': node,
             'type': vm_type,
-            'status': new_status['status']
+            'status': 'stopping',
+            'upid': upid
         }, message=f'{vm_type.upper()} stop initiated')
     except Exception as e:
-        return json_response(False, error=str(e))
+        return build_response(False, error=str(e))
 
 def shutdown_vm(api_url, username, token, node, vmid, vm_type, verify_ssl=True):
     """Gracefully shutdown VM or LXC container"""
     try:
         proxmox = connect_proxmox(api_url, username, token, verify_ssl)
         if not proxmox:
-            return json_response(False, error="Failed to connect to Proxmox API")
+            return build_response(False, error="Failed to connect to Proxmox API")
+
+        resource = _get_resource(proxmox, node, vmid, vm_type)
 
         # Check current status
-        if vm_type == 'qemu':
-            current = proxmox.nodes(node).qemu(vmid).status.current.get()
-            if current['status'] == 'stopped':
-                return json_response(True, data={'status': 'stopped'}, message=f'{vm_type.upper()} is already stopped')
-
-            # Graceful shutdown VM
-            proxmox.nodes(node).qemu(vmid).status.shutdown.post()
-        elif vm_type == 'lxc':
-            current = proxmox.nodes(node).lxc(vmid).status.current.get()
-            if current['status'] == 'stopped':
-                return json_response(True, data={'status': 'stopped'}, message=f'{vm_type.upper()} is already stopped')
-
-            # Graceful shutdown container
-            proxmox.nodes(node).lxc(vmid).status.shutdown.post()
-        else:
-            return json_response(False, error=f"Invalid VM type: {vm_type}")
+        current = resource.status.current.get()
+        if current['status'] == 'stopped':
+            return build_response(True, data={'status': 'stopped'}, message=f'{vm_type.upper()} is already stopped')
+
+        # Graceful shutdown
+        resource.status.shutdown.post()
 
-        return json_response(True, data={
+        return build_response(True, data={
             'vmid': vmid,
             'node': node,
             'type': vm_type,
             'status': 'shutting_down'
         }, message=f'{vm_type.upper()} graceful shutdown initiated')
     except Exception as e:
-        return json_response(False, error=str(e))
+        return build_response(False, error=str(e))
 
 def reboot_vm(api_url, username, token, node, vmid, vm_type, verify_ssl=True):
     """Reboot VM or LXC container"""
     try:
         proxmox = connect_proxmox(api_url, username, token, verify_ssl)
         if not proxmox:
-            return json_response(False, error="Failed to connect to Proxmox API")
+            return build_response(False, error="Failed to connect to Proxmox API")
 
-        if vm_type == 'qemu':
-            proxmox.nodes(node).qemu(vmid).status.reboot.post()
-        elif vm_type == 'lxc':
-            proxmox.nodes(node).lxc(vmid).status.reboot.post()
-        else:
-            return json_response(False, error=f"Invalid VM type: {vm_type}")
+        _get_resource(proxmox, node, vmid, vm_type).status.reboot.post()
 
-        return json_response(True, data={
+        return build_response(True, data={
             'vmid': vmid,
             'node': node,
             'type': vm_type
         }, message=f'{vm_type.upper()} reboot initiated')
     except Exception as e:
-        return json_response(False, error=str(e))
+        return build_response(False, error=str(e))
 
 def list_snapshots(api_url, username, token, node, vmid, vm_type, verify_ssl=True):
     """List all snapshots for VM or LXC"""
     try:
         proxmox = connect_proxmox(api_url, username, token, verify_ssl)
         if not proxmox:
-            return json_response(False, error="Failed to connect to Proxmox API")
+            return build_response(False, error="Failed to connect to Proxmox API")
 
-        if vm_type == 'qemu':
-            snapshots = proxmox.nodes(node).qemu(vmid).snapshot.get()
-        elif vm_type == 'lxc':
-            snapshots = proxmox.nodes(node).lxc(vmid).snapshot.get()
-        else:
-            return json_response(False, error=f"Invalid VM type: {vm_type}")
-
-        snapshot_list = []
-        for snap in snapshots:
-            if snap.get('name') not in ['current', None]:
-                snapshot_list.append({
-                    'name': snap.get('name'),
-                    'description': snap.get('description', ''),
-                    'snaptime': snap.get('snaptime', 0),
-                    'vmstate': snap.get('vmstate', 0)
-                })
-
-        return json_response(True, data={
+        snapshots = _get_resource(proxmox, node, vmid, vm_type).snapshot.get()
+        snapshot_list = list(iter_snapshot_records(snapshots))
+
+        return build_response(True, data={
             'vmid': vmid,
             'node': node,
             'type': vm_type,
@@ -248,145 +336,270 @@ def list_snapshots(api_url, username, token, node, vmid, vm_type, verify_ssl=Tru
             'count': len(snapshot_list)
         })
     except Exception as e:
-        return json_response(False, error=str(e))
+        return build_response(False, error=str(e))
+
+def iter_snapshot_records(snapshots):
+    """Yield list_snapshots records, skipping the 'current' pseudo-snapshot"""
+    return (
+        {
+            'name': snap['name'],
+            'description': snap.get('description', ''),
+            'snaptime': snap.get('snaptime', 0),
+            'vmstate': snap.get('vmstate', 0)
+        }
+        for snap in snapshots
+        if snap.get('name') not in _SKIP_NAMES
+    )
+
+def stream_snapshots(api_url, username, token, node, vmid, vm_type, verify_ssl=True):
+    """Write snapshots as newline-delimited JSON (one per line), then a summary response line"""
+    try:
+        proxmox = connect_proxmox(api_url, username, token, verify_ssl)
+        snapshots = _get_resource(proxmox, node, vmid, vm_type).snapshot.get()
+
+        count = 0
+        for record in iter_snapshot_records(snapshots):
+            write_line(record)
+            count += 1
+
+        summary = build_response(True, data={
+            'vmid': vmid,
+            'node': node,
+            'type': vm_type,
+            'count': count
+        })
+    except Exception as e:
+        summary = build_response(False, error=str(e))
+
+    write_line(summary)
 
 def create_snapshot(api_url, username, token, node, vmid, vm_type, snap_name, description='', verify_ssl=True):
     """Create snapshot of VM or LXC"""
     try:
         proxmox = connect_proxmox(api_url, username, token, verify_ssl)
         if not proxmox:
-            return json_response(False, error="Failed to connect to Proxmox API")
-
-        if vm_type == 'qemu':
-            proxmox.nodes(node).qemu(vmid).snapshot.post(
-                snapname=snap_name,
-                description=description,
-                vmstate=0  # Don't include RAM
-            )
-        elif vm_type == 'lxc':
-            proxmox.nodes(node).lxc(vmid).snapshot.post(
-                snapname=snap_name,
-                description=description
-            )
-        else:
-            return json_response(False, error=f"Invalid VM type: {vm_type}")
+            return build_response(False, error="Failed to connect to Proxmox API")
+
+        params = {'snapname': snap_name, 'description': description}
+        if vm_type == VMType.QEMU:
+            params['vmstate'] = 0  # Don't include RAM
+        _get_resource(proxmox, node, vmid, vm_type).snapshot.post(**params)
 
-        return json_response(True, data={
+        return build_response(True, data={
             'vmid': vmid,
             'node': node,
             'type': vm_type,
             'snapshot_name': snap_name
         }, message=f'Snapshot {snap_name} created')
     except Exception as e:
-        return json_response(False, error=str(e))
+        return build_response(False, error=str(e))
 
 def rollback_snapshot(api_url, username, token, node, vmid, vm_type, snap_name, verify_ssl=True):
     """Rollback VM or LXC to snapshot"""
     try:
         proxmox = connect_proxmox(api_url, username, token, verify_ssl)
         if not proxmox:
-            return json_response(False, error="Failed to connect to Proxmox API")
+            return build_response(False, error="Failed to connect to Proxmox API")
 
-        if vm_type == 'qemu':
-            proxmox.nodes(node).qemu(vmid).snapshot(snap_name).rollback.post()
-        elif vm_type == 'lxc':
-            proxmox.nodes(node).lxc(vmid).snapshot(snap_name).rollback.post()
-        else:
-            return json_response(False, error=f"Invalid VM type: {vm_type}")
+        _get_resource(proxmox, node, vmid, vm_type).snapshot(snap_name).rollback.post()
 
-        return json_response(True, data={
+        return build_response(True, data={
             'vmid': vmid,
             'node': node,
             'type': vm_type,
             'snapshot_name': snap_name
         }, message=f'Rolled back to snapshot {snap_name}')
     except Exception as e:
-        return json_response(False, error=str(e))
+        return build_response(False, error=str(e))
 
 def delete_snapshot(api_url, username, token, node, vmid, vm_type, snap_name, verify_ssl=True):
     """Delete snapshot from VM or LXC"""
     try:
         proxmox = connect_proxmox(api_url, username, token, verify_ssl)
         if not proxmox:
-            return json_response(False, error="Failed to connect to Proxmox API")
+            return build_response(False, error="Failed to connect to Proxmox API")
 
-        if vm_type == 'qemu':
-            proxmox.nodes(node).qemu(vmid).snapshot(snap_name).delete()
-        elif vm_type == 'lxc':
-            proxmox.nodes(node).lxc(vmid).snapshot(snap_name).delete()
-        else:
-            return json_response(False, error=f"Invalid VM type: {vm_type}")
+        _get_resource(proxmox, node, vmid, vm_type).snapshot(snap_name).delete()
 
-        return json_response(True, data={
+        return build_response(True, data={
             'vmid': vmid,
             'node': node,
             'type': vm_type,
             'snapshot_name': snap_name
         }, message=f'Snapshot {snap_name} deleted')
     except Exception as e:
-        return json_response(False, error=str(e))
+        return build_response(False, error=str(e))
 
 def list_vms(api_url, username, token, node, verify_ssl=True):
     """List all VMs and containers on a node"""
     try:
         proxmox = connect_proxmox(api_url, username, token, verify_ssl)
         if not proxmox:
-            return json_response(False, error="Failed to connect to Proxmox API")
-
-        vms = []
-
-        # Get QEMU VMs
-        qemu_vms = proxmox.nodes(node).qemu.get()
-        for vm in qemu_vms:
-            vms.append({
-                'vmid': vm['vmid'],
-                'name': vm.get('name', f'vm-{vm["vmid"]}'),
-                'type': 'qemu',
-                'status': vm.get('status', 'unknown'),
-                'cpus': vm.get('cpus', 0),
-                'maxmem': vm.get('maxmem', 0)
-            })
-
-        # Get LXC containers
-        lxc_containers = proxmox.nodes(node).lxc.get()
-        for container in lxc_containers:
-            vms.append({
-                'vmid': container['vmid'],
-                'name': container.get('name', f'ct-{container["vmid"]}'),
-                'type': 'lxc',
-                'status': container.get('status', 'unknown'),
-                'cpus': container.get('cpus', 0),
-                'maxmem': container.get('maxmem', 0)
-            })
-
-        return json_response(True, data={
+            return build_response(False, error="Failed to connect to Proxmox API")
+
+        vms = list(iter_vm_records(proxmox, node))
+
+        return build_response(True, data={
             'node': node,
             'vms': vms,
             'count': len(vms)
         })
     except Exception as e:
-        return json_response(False, error=str(e))
+        return build_response(False, error=str(e))
+
+def iter_vm_records(proxmox, node):
+    """Yield list_vms records: QEMU VMs, then LXC containers"""
+    # Fetch QEMU VMs and LXC containers concurrently over the shared session
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        qemu_future = executor.submit(proxmox.nodes(node).qemu.get)
+        lxc_future = executor.submit(proxmox.nodes(node).lxc.get)
+        qemu_vms = qemu_future.result()
+        lxc_containers = lxc_future.result()
+
+    # QEMU VMs
+    for vm in qemu_vms:
+        yield {
+            'vmid': vm['vmid'],
+            'name': vm.get('name', f'vm-{vm["vmid"]}'),
+            'type': VMType.QEMU.value,
+            'status': vm.get('status', 'unknown'),
+            'cpus': vm.get('cpus', 0),
+            'maxmem': vm.get('maxmem', 0)
+        }
+
+    # LXC containers
+    for container in lxc_containers:
+        yield {
+            'vmid': container['vmid'],
+            'name': container.get('name', f'ct-{container["vmid"]}'),
+            'type': VMType.LXC.value,
+            'status': container.get('status', 'unknown'),
+            'cpus': container.get('cpus', 0),
+            'maxmem': container.get('maxmem', 0)
+        }
+
+def stream_vms(api_url, username, token, node, verify_ssl=True):
+    """Write VMs/containers as newline-delimited JSON (one per line), then a summary response line"""
+    try:
+        proxmox = connect_proxmox(api_url, username, token, verify_ssl)
+
+        count = 0
+        for record in iter_vm_records(proxmox, node):
+            write_line(record)
+            count += 1
+
+        summary = build_response(True, data={'node': node, 'count': count})
+    except Exception as e:
+        summary = build_response(False, error=str(e))
+
+    write_line(summary)
 
 def test_connection(api_url, username, token, verify_ssl=True):
     """Test connection to Proxmox API"""
     try:
         proxmox = connect_proxmox(api_url, username, token, verify_ssl)
         if not proxmox:
-            return json_response(False, error="Failed to connect to Proxmox API")
+            return build_response(False, error="Failed to connect to Proxmox API")
 
         # Get cluster status or version
         version = proxmox.version.get()
         nodes = proxmox.nodes.get()
 
-        return json_response(True, data={
+        return build_response(True, data={
             'version': version.get('version', 'unknown'),
             'nodes': [node['node'] for node in nodes],
             'node_count': len(nodes)
         }, message='Connection successful')
     except Exception as e:
-        return json_response(False, error=str(e))
+        return build_response(False, error=str(e))
+
+def _bool(value):
+    """CLI boolean: only 'true' (any case) is True"""
+    return value.lower() == 'true'
+
+# Positional CLI arguments per command: a name (str), or (name, converter[, default]).
+# Arguments with a default are optional and trail the required ones.
+_VM_ARGS = ['api_url', 'username', 'token', 'node', ('vmid', int), ('vm_type', parse_vm_type)]
+_VERIFY_SSL = ('verify_ssl', _bool, True)
+
+DISPATCH = {
+    'test_connection': (test_connection, ['api_url', 'username', 'token', _VERIFY_SSL]),
+    'get_vm_status': (get_vm_status, _VM_ARGS + [_VERIFY_SSL]),
+    'get_vm_status_batch': (get_vm_status_batch, ['api_url', 'username', 'token', 'node', ('vms', json.loads), _VERIFY_SSL]),
+    'start_vm': (start_vm, _VM_ARGS + [_VERIFY_SSL]),
+    'stop_vm': (stop_vm, _VM_ARGS + [_VERIFY_SSL]),
+    'shutdown_vm': (shutdown_vm, _VM_ARGS + [_VERIFY_SSL]),
+    'reboot_vm': (reboot_vm, _VM_ARGS + [_VERIFY_SSL]),
+    'list_snapshots': (list_snapshots, _VM_ARGS + [_VERIFY_SSL]),
+    'create_snapshot': (create_snapshot, _VM_ARGS + ['snap_name', ('description', str, ''), _VERIFY_SSL]),
+    'rollback_snapshot': (rollback_snapshot, _VM_ARGS + ['snap_name', _VERIFY_SSL]),
+    'delete_snapshot': (delete_snapshot, _VM_ARGS + ['snap_name', _VERIFY_SSL]),
+    'list_vms': (list_vms, ['api_url', 'username', 'token', 'node', _VERIFY_SSL]),
+}
+
+# --stream variants: same arguments, NDJSON output
+STREAM_DISPATCH = {
+    'list_snapshots': stream_snapshots,
+    'list_vms': stream_vms,
+}
+
+def bind_args(spec, argv):
+    """Map positional CLI arguments onto keyword arguments; raises IndexError if a required one is missing"""
+    kwargs = {}
+    for position, arg in enumerate(spec):
+        name, convert = (arg, str) if isinstance(arg, str) else arg[:2]
+        if position < len(argv):
+            kwargs[name] = convert(argv[position])
+        elif len(arg) == 3 and not isinstance(arg, str):
+            kwargs[name] = arg[2]
+        else:
+            raise IndexError(name)
+    return kwargs
+
+def daemon_one(line):
+    """Run one daemon request line and return its reply"""
+    request_id = None
+    try:
+        request = json.loads(line)
+        request_id = request.get('id')
+        entry = DISPATCH.get(request.get('cmd'))
+        if entry:
+            result = entry[0](**request.get('args', {}))
+        else:
+            result = build_response(False, error=f"Unknown command: {request.get('cmd')}")
+    except (ValueError, TypeError, AttributeError) as e:
+        result = build_response(False, error=f"Invalid request: {e}")
+
+    result['id'] = request_id
+    return result
+
+def write_line(obj):
+    """Write obj to stdout as one line of JSON (orjson bytes go straight to the buffer)"""
+    if orjson:
+        sys.stdout.buffer.write(orjson.dumps(obj, option=orjson.OPT_APPEND_NEWLINE))
+    else:
+        sys.stdout.write(json.dumps(obj, separators=(',', ':')) + "\n")
+    sys.stdout.flush()
+
+def daemon():
+    """
+    Long-lived worker: read one JSON command per stdin line, e.g.
+    {"id": 1, "cmd": "get_vm_status", "args": {"api_url": ..., "node": "pve", "vmid": 100, ...}},
+    and write one JSON reply per line. The Proxmox session stays open between commands.
+    """
+    for line in sys.stdin:
+        if not line.strip():
+            continue
+        write_line(daemon_one(line))
 
 if __name__ == "__main__":
+    if '--pretty' in sys.argv:
+        sys.argv.remove('--pretty')
+        PRETTY = True
+    stream = '--stream' in sys.argv
+    if stream:
+        sys.argv.remove('--stream')
+
     if len(sys.argv) < 2:
         print(json_response(False, error="Usage: proxmox_api.py <command> <args>"))
         sys.exit(1)
@@ -394,61 +607,15 @@ if __name__ == "__main__":
     command = sys.argv[1]
 
     try:
-        if command == 'test_connection':
-            api_url, username, token = sys.argv[2], sys.argv[3], sys.argv[4]
-            verify_ssl = sys.argv[5].lower() == 'true' if len(sys.argv) > 5 else True
-            print(test_connection(api_url, username, token, verify_ssl))
-
-        elif command == 'get_vm_status':
-            api_url, username, token, node, vmid, vm_type = sys.argv[2:8]
-            verify_ssl = sys.argv[8].lower() == 'true' if len(sys.argv) > 8 else True
-            print(get_vm_status(api_url, username, token, node, int(vmid), vm_type, verify_ssl))
-
-        elif command == 'start_vm':
-            api_url, username, token, node, vmid, vm_type = sys.argv[2:8]
-            verify_ssl = sys.argv[8].lower() == 'true' if len(sys.argv) > 8 else True
-            print(start_vm(api_url, username, token, node, int(vmid), vm_type, verify_ssl))
-
-        elif command == 'stop_vm':
-            api_url, username, token, node, vmid, vm_type = sys.argv[2:8]
-            verify_ssl = sys.argv[8].lower() == 'true' if len(sys.argv) > 8 else True
-            print(stop_vm(api_url, username, token, node, int(vmid), vm_type, verify_ssl))
-
-        elif command == 'shutdown_vm':
-            api_url, username, token, node, vmid, vm_type = sys.argv[2:8]
-            verify_ssl = sys.argv[8].lower() == 'true' if len(sys.argv) > 8 else True
-            print(shutdown_vm(api_url, username, token, node, int(vmid), vm_type, verify_ssl))
-
-        elif command == 'reboot_vm':
-            api_url, username, token, node, vmid, vm_type = sys.argv[2:8]
-            verify_ssl = sys.argv[8].lower() == 'true' if len(sys.argv) > 8 else True
-            print(reboot_vm(api_url, username, token, node, int(vmid), vm_type, verify_ssl))
-
-        elif command == 'list_snapshots':
-            api_url, username, token, node, vmid, vm_type = sys.argv[2:8]
-            verify_ssl = sys.argv[8].lower() == 'true' if len(sys.argv) > 8 else True
-            print(list_snapshots(api_url, username, token, node, int(vmid), vm_type, verify_ssl))
-
-        elif command == 'create_snapshot':
-            api_url, username, token, node, vmid, vm_type, snap_name = sys.argv[2:9]
-            description = sys.argv[9] if len(sys.argv) > 9 else ''
-            verify_ssl = sys.argv[10].lower() == 'true' if len(sys.argv) > 10 else True
-            print(create_snapshot(api_url, username, token, node, int(vmid), vm_type, snap_name, description, verify_ssl))
-
-        elif command == 'rollback_snapshot':
-            api_url, username, token, node, vmid, vm_type, snap_name = sys.argv[2:9]
-            verify_ssl = sys.argv[9].lower() == 'true' if len(sys.argv) > 9 else True
-            print(rollback_snapshot(api_url, username, token, node, int(vmid), vm_type, snap_name, verify_ssl))
-
-        elif command == 'delete_snapshot':
-            api_url, username, token, node, vmid, vm_type, snap_name = sys.argv[2:9]
-            verify_ssl = sys.argv[9].lower() == 'true' if len(sys.argv) > 9 else True
-            print(delete_snapshot(api_url, username, token, node, int(vmid), vm_type, snap_name, verify_ssl))
-
-        elif command == 'list_vms':
-            api_url, username, token, node = sys.argv[2:6]
-            verify_ssl = sys.argv[6].lower() == 'true' if len(sys.argv) > 6 else True
-            print(list_vms(api_url, username, token, node, verify_ssl))
+        if command == 'daemon':
+            daemon()
+
+        elif stream and command in STREAM_DISPATCH:
+            STREAM_DISPATCH[command](**bind_args(DISPATCH[command][1], sys.argv[2:]))
+
+        elif command in DISPATCH:
+            func, spec = DISPATCH[command]
+            print(dumps(func(**bind_args(spec, sys.argv[2:]))))
 
         else:
             print(json_response(False, error=f"Unknown command: {command}"))
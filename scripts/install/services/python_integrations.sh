@@ -118,6 +118,7 @@ install_integration_packages() {
   echo "  • proxmoxer (Proxmox VE API)"
   echo "  • urllib3 (HTTP library)"
   echo "  • requests (HTTP library)"
+  echo "  • orjson (fast JSON serialization)"
   echo ""
 
   if ! retry_command 3 5 "${INTEGRATIONS_VENV_DIR}/bin/pip" install \
@@ -125,7 +126,8 @@ install_integration_packages() {
     "hcloud>=1.33.0" \
     "proxmoxer>=2.0.0" \
     "urllib3>=2.0.0" \
-    "requests>=2.28.0"; then
+    "requests>=2.28.0" \
+    "orjson>=3.9.0"; then
     error "Failed to install Python integration packages after multiple attempts"
     error "This may be due to:"
     error "  - Network connectivity issues"
@@ -190,6 +192,13 @@ test_package_installations() {
     warning "requests test failed (non-critical)"
   fi
 
+  # Test orjson (optional, scripts fall back to stdlib json)
+  if "${INTEGRATIONS_VENV_DIR}/bin/python" -c "import orjson; print('orjson:', orjson.__version__)" >> "${LOG_FILE}" 2>&1; then
+    success "orjson OK"
+  else
+    warning "orjson test failed (non-critical)"
+  fi
+
   if [ "$all_ok" = true ]; then
     success "All critical packages verified"
     return 0
@@ -265,6 +274,7 @@ display_integration_info() {
   echo "  • proxmoxer - Proxmox VE API client"
   echo "  • urllib3 - HTTP library"
   echo "  • requests - HTTP library"
+  echo "  • orjson - Fast JSON serialization"
 
   echo ""
   info "Integration features enabled:"